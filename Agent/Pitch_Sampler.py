@@ -1,22 +1,143 @@
-import sys
 import os
-# Add the parent directory of 'Agent' to the Python path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import soundfile as sf
 import numpy as np
 import asyncio
-import time
+import functools
 import pyaudio
-import librosa # For pitch detection
+import scipy.fft
+from numba import njit
 from typing import AsyncGenerator, Optional, Tuple
 
 # Assuming config.py will have PITCH_SAMPLING_INTERVAL_MS
 from Agent.config import (
     PITCH_SAMPLING_INTERVAL_MS,
     AUDIO_SEND_SAMPLE_RATE, # Example for live audio sample rate
+    AUDIO_CHANNELS,
     AUDIO_FORMAT as DEFAULT_AUDIO_FORMAT, # Example for live audio format
+    PITCH_DETECTION_METHOD,
+    PITCH_YIN_THRESHOLD,
     PROJECT_ROOT
 )
+from Agent import _buffer_pool
+from Agent._audio_simd import yin_pick_lag as _precompiled_yin_pick_lag
+
+# Detectable pitch range, computed from MIDI note numbers (A4 = 69 = 440 Hz) so librosa
+# isn't needed at import
+_FMIN = 440.0 * 2.0 ** ((36 - 69) / 12.0) # C2, approx 65 Hz
+_FMAX = 440.0 * 2.0 ** ((96 - 69) / 12.0) # C7, approx 2093 Hz
+
+@functools.lru_cache(maxsize=None)
+def _fft_length(sample_count: int) -> int:
+    """
+    Returns the fastest real FFT length that holds a chunk without circular wrap-around.
+
+    Args:
+        sample_count: The number of samples in the chunk.
+
+    Returns:
+        int: The padded FFT length.
+    """
+    return scipy.fft.next_fast_len(sample_count, real=True)
+
+def _yin_difference(samples: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Computes the YIN difference function for lags 0..max_lag via FFT cross-correlation.
+
+    Uses d(lag) = E(0) + E(lag) - 2 r(lag), where r is the correlation of the first
+    (size - max_lag) samples with the whole chunk and E are the matching window energies.
+
+    Args:
+        samples: The mono audio samples as floats.
+        max_lag: The largest lag to evaluate; must be less than samples.size.
+
+    Returns:
+        np.ndarray: The difference function, indexed by lag.
+    """
+    window = samples.size - max_lag
+    fft_length = _fft_length(samples.size)
+    spectrum = scipy.fft.rfft(samples, fft_length)
+    spectrum *= np.conj(scipy.fft.rfft(samples[:window], fft_length))
+    correlation = scipy.fft.irfft(spectrum, fft_length)[:max_lag + 1]
+
+    # Running energy, so E(lag) is the energy of samples[lag:lag + window]
+    energy = np.empty(samples.size + 1, dtype=np.float64)
+    energy[0] = 0.0
+    np.cumsum(np.square(samples, dtype=np.float64), out=energy[1:])
+    diff = energy[window:window + max_lag + 1] - energy[:max_lag + 1]
+    diff += energy[window]
+    diff -= 2.0 * correlation
+    return diff
+
+@njit(cache=True, fastmath=True)
+def _yin_pick_lag(diff: np.ndarray, sample_rate: int, min_lag: int, threshold: float) -> float:
+    """
+    Picks the pitch from a YIN difference function.
+
+    Args:
+        diff: The difference function, indexed by lag.
+        sample_rate: The sample rate of the analysed samples.
+        min_lag: The smallest lag (highest pitch) to consider.
+        threshold: The cumulative mean normalised difference threshold for a voiced lag.
+
+    Returns:
+        float: The estimated pitch in Hz, or 0.0 if the chunk is unvoiced.
+    """
+    max_lag = diff.size - 1
+
+    # Cumulative mean normalised difference
+    cmnd = np.ones(max_lag + 1)
+    running = 0.0
+    for lag in range(1, max_lag + 1):
+        running += diff[lag]
+        if running > 0.0:
+            cmnd[lag] = diff[lag] * lag / running
+
+    # First dip below the threshold, followed down to its local minimum
+    best = -1
+    lag = min_lag
+    while lag < max_lag:
+        if cmnd[lag] < threshold:
+            while lag + 1 < max_lag and cmnd[lag + 1] < cmnd[lag]:
+                lag += 1
+            best = lag
+            break
+        lag += 1
+    if best < 0:
+        return 0.0
+
+    # Parabolic interpolation around the chosen lag
+    shift = 0.0
+    denom = cmnd[best - 1] - 2.0 * cmnd[best] + cmnd[best + 1]
+    if denom != 0.0:
+        shift = 0.5 * (cmnd[best - 1] - cmnd[best + 1]) / denom
+    return sample_rate / (best + shift)
+
+def _yin_pitch(samples: np.ndarray, sample_rate: int, fmin: float, fmax: float, threshold: float) -> float:
+    """
+    Estimates a single fundamental frequency for a chunk using the YIN algorithm.
+
+    Args:
+        samples: The mono audio samples as floats.
+        sample_rate: The sample rate of the samples.
+        fmin: The lowest detectable pitch in Hz.
+        fmax: The highest detectable pitch in Hz.
+        threshold: The cumulative mean normalised difference threshold for a voiced lag.
+
+    Returns:
+        float: The estimated pitch in Hz, or 0.0 if the chunk is unvoiced.
+    """
+    min_lag = max(int(sample_rate / fmax), 2)
+    max_lag = min(int(sample_rate / fmin), samples.size // 2)
+    if max_lag <= min_lag + 1:
+        return 0.0
+    return _pick_lag(_yin_difference(samples, max_lag), sample_rate, min_lag, threshold)
+
+# Prefer the precompiled lag picker; otherwise compile the Numba one at import, keeping JIT out of the audio loop.
+if _precompiled_yin_pick_lag is not None:
+    _pick_lag = _precompiled_yin_pick_lag
+else:
+    _pick_lag = _yin_pick_lag
+    _yin_pitch(np.zeros(256, dtype=np.float32), AUDIO_SEND_SAMPLE_RATE, _FMIN, _FMAX, PITCH_YIN_THRESHOLD)
 
 def calculate_pitch_from_float_array(audio_chunk_float: np.ndarray, sample_rate: int) -> int:
     """
@@ -33,26 +154,57 @@ def calculate_pitch_from_float_array(audio_chunk_float: np.ndarray, sample_rate:
         return 0
 
     try:
-        # Using librosa.pyin for pitch detection
+        if PITCH_DETECTION_METHOD == "yin":
+            return int(_yin_pitch(
+                audio_chunk_float,
+                sample_rate,
+                _FMIN,
+                _FMAX,
+                PITCH_YIN_THRESHOLD
+            ))
+
+        # Using librosa.pyin for pitch detection; librosa is heavy, so it is only imported when selected
+        import librosa
         # fmin and fmax can be tuned based on expected pitch range (e.g., human voice)
         f0, voiced_flag, voiced_probs = librosa.pyin(
             audio_chunk_float,
-            fmin=librosa.note_to_hz('C2'), # Approx 65 Hz
-            fmax=librosa.note_to_hz('C7'), # Approx 2093 Hz
+            fmin=_FMIN,
+            fmax=_FMAX,
             sr=sample_rate
         )
 
-        pitch_hz = 0
-        if f0 is not None and len(f0) > 0:
-            valid_pitches = f0[~np.isnan(f0)]
-            if len(valid_pitches) > 0:
-                pitch_hz = int(np.mean(valid_pitches)) # Average valid pitches in the chunk
-        return pitch_hz
+        # pyin fills unvoiced frames of f0 with NaN. Checking voiced_flag first means nanmean,
+        # which averages the voiced frames in one call, never warns about an all-NaN chunk.
+        if f0 is not None and f0.size > 0 and voiced_flag.any():
+            return int(np.nanmean(f0))
+        return 0
     except Exception as e:
         # print(f"Error calculating pitch: {e}") # Optional: log error
         return 0
 
-def calculate_pitch_from_bytes(audio_chunk_bytes: bytes, sample_rate: int, audio_format=DEFAULT_AUDIO_FORMAT) -> int:
+def _downmix_into(frames: np.ndarray, scale: float, out: np.ndarray) -> np.ndarray:
+    """
+    Averages (samples, channels) audio into a mono float32 buffer, applying a normalisation scale.
+
+    Args:
+        frames: The multi-channel samples, one row per frame.
+        scale: The factor applied to the averaged samples (e.g., 1/32768 for int16).
+        out: A float32 buffer with one element per frame.
+
+    Returns:
+        np.ndarray: The out buffer holding the mono samples.
+    """
+    if frames.shape[1] == 2:
+        # Stereo: one add and one in-place scale, without a mean() intermediate
+        np.add(frames[:, 0], frames[:, 1], out=out, dtype=np.float32, casting='unsafe')
+        np.multiply(out, np.float32(0.5 * scale), out=out)
+    else:
+        np.mean(frames, axis=1, dtype=np.float32, out=out)
+        if scale != 1.0:
+            np.multiply(out, np.float32(scale), out=out)
+    return out
+
+def calculate_pitch_from_bytes(audio_chunk_bytes: bytes, sample_rate: int, audio_format=DEFAULT_AUDIO_FORMAT, channels: int = AUDIO_CHANNELS) -> int:
     """
     Calculates the fundamental frequency (pitch) from a chunk of audio bytes.
 
@@ -60,6 +212,7 @@ def calculate_pitch_from_bytes(audio_chunk_bytes: bytes, sample_rate: int, audio
         audio_chunk_bytes: The chunk of audio data in bytes.
         sample_rate: The sample rate of the audio chunk.
         audio_format: The PyAudio format of the bytes (e.g., pyaudio.paInt16).
+        channels: The number of interleaved channels in the bytes; multi-channel audio is downmixed to mono.
 
     Returns:
         int: The calculated pitch in Hz. Returns 0 if pitch cannot be detected.
@@ -81,20 +234,21 @@ def calculate_pitch_from_bytes(audio_chunk_bytes: bytes, sample_rate: int, audio
         return 0
 
     numpy_array = np.frombuffer(audio_chunk_bytes, dtype=numpy_dtype)
-    
-    if numpy_dtype != np.float32:
-        float_array = numpy_array.astype(np.float32) / normalization_factor
-    else:
-        float_array = numpy_array
-    
-    # If stereo, convert to mono by averaging channels. Librosa needs mono.
-    if float_array.ndim > 1 and float_array.shape[1] > 1: # Check if it's multi-channel
-         float_array = np.mean(float_array, axis=1)
-    elif float_array.ndim > 1 and float_array.shape[1] == 1: # (N, 1) shape
-         float_array = float_array.flatten()
 
+    if numpy_dtype == np.float32 and channels == 1:
+        return calculate_pitch_from_float_array(numpy_array, sample_rate)
 
-    return calculate_pitch_from_float_array(float_array, sample_rate)
+    frame_count = numpy_array.size // channels
+    scale = 1.0 / normalization_factor
+
+    # Convert, normalise and downmix into a pooled buffer, returned once pitch is known
+    with _buffer_pool.lease(frame_count) as float_array:
+        if channels == 1:
+            np.multiply(numpy_array, np.float32(scale), out=float_array, dtype=np.float32, casting='unsafe')
+        else:
+            frames = numpy_array[:frame_count * channels].reshape(frame_count, channels)
+            _downmix_into(frames, scale, float_array)
+        return calculate_pitch_from_float_array(float_array, sample_rate)
 
 async def stream_audio_and_calculate_pitch(audio_file_path: str, play_audio: bool = False) -> AsyncGenerator[int, None]:
     """
@@ -110,58 +264,53 @@ async def stream_audio_and_calculate_pitch(audio_file_path: str, play_audio: boo
     p = None
     player_stream = None
     try:
-        data_for_playback, samplerate = sf.read(audio_file_path, dtype='float32', always_2d=False)
-        
-        if data_for_playback.ndim > 1: # If stereo or more channels
-            # librosa.to_mono expects (channels, samples) if y.ndim > 1
-            # soundfile reads (samples, channels)
-            data_for_pitch = librosa.to_mono(data_for_playback.T)
-        else:
-            data_for_pitch = data_for_playback
-
+        sound_file = sf.SoundFile(audio_file_path)
     except Exception as e:
         print(f"Error reading audio file {audio_file_path}: {e}")
         return
 
-    if play_audio:
-        p = pyaudio.PyAudio()
-        player_stream = p.open(format=pyaudio.paFloat32,
-                               channels=data_for_playback.ndim if data_for_playback.ndim > 0 else 1,
-                               rate=samplerate,
-                               output=True)
+    with sound_file:
+        samplerate = sound_file.samplerate
 
-    samples_per_interval = int(samplerate * (PITCH_SAMPLING_INTERVAL_MS / 1000.0))
-    
-    num_frames_pitch = len(data_for_pitch)
-    # num_frames_playback = len(data_for_playback) # Not directly used in loop condition
-    current_pos = 0
-
-    while current_pos < num_frames_pitch:
-        start_time = time.monotonic()
-        
-        end_pos = min(current_pos + samples_per_interval, num_frames_pitch)
-        chunk_for_pitch_calc = data_for_pitch[current_pos:end_pos]
-        
-        if chunk_for_pitch_calc.size == 0:
-            break
+        if play_audio:
+            p = pyaudio.PyAudio()
+            player_stream = p.open(format=pyaudio.paFloat32,
+                                   channels=sound_file.channels,
+                                   rate=samplerate,
+                                   output=True)
+
+        interval_s = PITCH_SAMPLING_INTERVAL_MS / 1000.0
+        samples_per_interval = int(samplerate * interval_s)
+
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
 
-        pitch_value = calculate_pitch_from_float_array(chunk_for_pitch_calc, samplerate)
-        
-        if play_audio and player_stream:
-            # For playback, use the corresponding chunk from original data
-            # Ensure current_pos and end_pos are valid for data_for_playback if it had different length (e.g. stereo processing)
-            # However, current_pos and end_pos are sample indices, so they should align.
-            playback_chunk_end_pos = min(current_pos + samples_per_interval, len(data_for_playback))
-            chunk_for_playback = data_for_playback[current_pos:playback_chunk_end_pos]
-            if chunk_for_playback.size > 0:
-                 player_stream.write(chunk_for_playback.tobytes())
-        
-        yield pitch_value
+        # Decode one interval at a time so memory use doesn't grow with the file length
+        for chunk_for_playback in sound_file.blocks(blocksize=samples_per_interval, dtype='float32', always_2d=False):
+            if chunk_for_playback.size == 0:
+                break
 
-        current_pos = end_pos
+            # soundfile yields (samples, channels) for multi-channel files; pitch needs mono
+            if chunk_for_playback.ndim > 1:
+                with _buffer_pool.lease(len(chunk_for_playback)) as chunk_for_pitch_calc:
+                    _downmix_into(chunk_for_playback, 1.0, chunk_for_pitch_calc)
+                    pitch_value = calculate_pitch_from_float_array(chunk_for_pitch_calc, samplerate)
+            else:
+                pitch_value = calculate_pitch_from_float_array(chunk_for_playback, samplerate)
 
-        processing_time = time.monotonic() - start_time
-        await asyncio.sleep(max(0, (PITCH_SAMPLING_INTERVAL_MS / 1000.0) - processing_time))
+            if play_audio and player_stream:
+                # Play the original (possibly multi-channel) chunk as a byte view, without a tobytes() copy
+                player_stream.write(memoryview(chunk_for_playback).cast('B'))
+
+            yield pitch_value
+
+            # Sleep until an absolute deadline so per-tick overhead doesn't accumulate as drift
+            next_tick += interval_s
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time() # Fell behind; resume pacing from now rather than catching up
 
     if play_audio and player_stream:
         player_stream.stop_stream()
@@ -172,6 +321,8 @@ async def stream_audio_and_calculate_pitch(audio_file_path: str, play_audio: boo
 async def main():
     """
     Main function to demonstrate audio streaming and pitch calculation.
+
+    Run from the project root with: python -m Agent.Pitch_Sampler
     """
     audio_sample_filename = "Introduction.wav" # Or "How to make bread.wav"
     audio_sample_path = os.path.join(PROJECT_ROOT, "Audio Samples", audio_sample_filename)
@@ -1,14 +1,73 @@
-import sys
 import os
-# Add the parent directory of 'Agent' to the Python path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import soundfile as sf
 import numpy as np
 import asyncio
-import time
-import pyaudio
-from typing import AsyncGenerator
+import math
+from numba import njit
+from typing import AsyncGenerator, Union
 from Agent.config import RMS_SAMPLING_INTERVAL_MS, PROJECT_ROOT
+from Agent._audio_simd import (
+    rms_int16 as _simd_rms_int16,
+    rms_per_interval_float32 as _precompiled_rms_per_interval
+)
+
+@njit(cache=True, fastmath=True)
+def _rms_int16(samples: np.ndarray) -> float:
+    """
+    Calculates the normalised RMS of int16 samples in a single integer pass without temporary arrays.
+
+    Args:
+        samples: A non-empty array of int16 samples.
+
+    Returns:
+        float: The RMS value normalised to the range [0.0, 1.0].
+    """
+    # Integer accumulation is exact and skips per-sample float conversion; int64 cannot
+    # overflow below ~8.6e9 samples of full-scale audio.
+    total = np.int64(0)
+    for i in range(samples.size):
+        value = np.int64(samples[i])
+        total += value * value
+    return math.sqrt(total / samples.size) / 32768.0
+
+# Compile for read-only buffers (as produced by np.frombuffer on bytes) at import,
+# so the first JIT compilation doesn't land inside the audio loop. Not needed when the
+# precompiled kernel handles the bytes path.
+if _simd_rms_int16 is None:
+    _rms_int16(np.frombuffer(bytes(2), dtype=np.int16))
+
+# Sampling intervals decoded and analysed together per file read
+_RMS_BATCH_INTERVALS = 32
+
+@njit(cache=True, fastmath=True)
+def _rms_per_interval(samples: np.ndarray, interval_size: int) -> np.ndarray:
+    """
+    Calculates the RMS of each consecutive interval of float samples in a single pass.
+
+    Args:
+        samples: A non-empty, contiguous 1-D array of float samples.
+        interval_size: The number of samples per interval; the last interval may be shorter.
+
+    Returns:
+        np.ndarray: The RMS value of each interval, in order.
+    """
+    count = (samples.size + interval_size - 1) // interval_size
+    rms_values = np.empty(count)
+    for k in range(count):
+        start = k * interval_size
+        end = min(start + interval_size, samples.size)
+        total = 0.0
+        for i in range(start, end):
+            total += samples[i] * samples[i]
+        rms_values[k] = math.sqrt(total / (end - start))
+    return rms_values
+
+# Prefer the precompiled kernel; otherwise compile the Numba one for float32 blocks at import.
+if _precompiled_rms_per_interval is not None:
+    _interval_rms = _precompiled_rms_per_interval
+else:
+    _interval_rms = _rms_per_interval
+    _rms_per_interval(np.zeros(1, dtype=np.float32), 1)
 
 def calculate_rms_from_bytes(audio_chunk_bytes: bytes) -> float:
     """
@@ -25,18 +84,13 @@ def calculate_rms_from_bytes(audio_chunk_bytes: bytes) -> float:
         return 0.0
     
     # Assuming audio_chunk_bytes are int16, as per AUDIO_FORMAT
-    numpy_array = np.frombuffer(audio_chunk_bytes, dtype=np.int16)
-    
-    # Normalise to [-1.0, 1.0]
-    float_array = numpy_array.astype(np.float32) / 32768.0
-    
-    # Calculate RMS
-    rms = np.sqrt(np.mean(float_array**2))
-    
-    if np.isnan(rms): # Handle cases like all zeros after normalization if any issue
-        return 0.0
-    return rms
-async def stream_audio_and_calculate_rms(audio_file_path: str, play_audio: bool = False) -> AsyncGenerator[float, None]:
+    if _simd_rms_int16 is not None and type(audio_chunk_bytes) is bytes:
+        return _simd_rms_int16(audio_chunk_bytes)
+    return _rms_int16(np.frombuffer(audio_chunk_bytes, dtype=np.int16))
+
+async def stream_audio_and_calculate_rms(
+    audio_file_path: str, play_audio: bool = False, batch: int = 1
+) -> AsyncGenerator[Union[float, np.ndarray], None]:
     """
     Streams audio data from a file, calculates RMS values at specified intervals,
     yields them, optionally plays the audio, and optionally prints an RMS bar.
@@ -44,52 +98,73 @@ async def stream_audio_and_calculate_rms(audio_file_path: str, play_audio: bool
     Args:
         audio_file_path: The path to the audio file.
         play_audio: Whether to play the audio during processing.
+        batch: The number of consecutive intervals yielded together. Above 1, values are
+               yielded (and paced) as float32 arrays of up to this many intervals.
     Yields:
-        float: The calculated RMS value for each chunk.
+        Union[float, np.ndarray]: The RMS value of each interval, or a float32 array of the
+                                  RMS values of each batch of intervals.
     """
     p = None
     stream = None
     try:
-        data, samplerate = sf.read(audio_file_path, dtype='float32') # Read as float32 for PyAudio
+        sound_file = sf.SoundFile(audio_file_path)
     except Exception as e:
         print(f"Error reading audio file: {e}")
         return
 
-    if play_audio:
-        p = pyaudio.PyAudio()
-        stream = p.open(format=pyaudio.paFloat32, # Use paFloat32 for float32 data
-                        channels=data.ndim, # Use number of channels from audio file
-                        rate=samplerate,
-                        output=True)
+    with sound_file:
+        samplerate = sound_file.samplerate
 
-    samples_per_interval = int(samplerate * (RMS_SAMPLING_INTERVAL_MS / 1000.0))
-    
-    num_frames = len(data)
-    current_pos = 0
+        if play_audio:
+            import pyaudio # Only needed for playback
+            p = pyaudio.PyAudio()
+            stream = p.open(format=pyaudio.paFloat32, # Use paFloat32 for float32 data
+                            channels=sound_file.channels, # Use number of channels from audio file
+                            rate=samplerate,
+                            output=True)
 
-    while current_pos < num_frames:
-        start_time = time.monotonic()
-        
-        end_pos = min(current_pos + samples_per_interval, num_frames)
-        chunk = data[current_pos:end_pos]
-        
-        if chunk.size == 0: # Skip empty chunks at the end
-            break
+        # Everything the per-tick loop needs is fixed for the file, so bind it to locals once
+        interval_s = RMS_SAMPLING_INTERVAL_MS / 1000.0
+        samples_per_interval = int(samplerate * interval_s)
+        interval_size = samples_per_interval * sound_file.channels
+        write = stream.write if play_audio and stream else None
+        sleep = asyncio.sleep
+        clock = asyncio.get_running_loop().time
+        # Whole yielded batches per read, so a batch never straddles two blocks
+        block_intervals = batch * max(1, -(-_RMS_BATCH_INTERVALS // batch))
+        next_tick = clock()
 
-        # Calculate RMS value for the current chunk
-        rms_value = np.sqrt(np.mean(chunk**2))
+        # Decode a batch of intervals per read, so memory use doesn't grow with the file length
+        # and the per-interval RMS is computed in one call rather than once per tick
+        for block in sound_file.blocks(blocksize=samples_per_interval * block_intervals,
+                                       dtype='float32', always_2d=True):
+            # RMS across all channels for each interval of the block
+            rms_values = _interval_rms(block.reshape(-1), interval_size)
+            if batch == 1:
+                items = rms_values.tolist()
+            else:
+                rms_values = rms_values.astype(np.float32)
+                items = [rms_values[i:i + batch] for i in range(0, rms_values.size, batch)]
 
-        if play_audio and stream:
-            # PyAudio expects bytes, so convert float32 numpy array to bytes
-            # Ensure the audio data is in the correct format (float32)
-            stream.write(chunk.tobytes())
-        
-        yield rms_value
+            start = 0
+            for item in items:
+                intervals = 1 if batch == 1 else item.size
+                if write is not None:
+                    # PyAudio accepts any bytes-like object, so pass a byte view of the
+                    # contiguous float32 intervals rather than copying them with tobytes()
+                    span = samples_per_interval * intervals
+                    write(memoryview(block[start:start + span]).cast('B'))
+                    start += span
 
-        current_pos = end_pos
+                yield item
 
-        processing_time = time.monotonic() - start_time
-        await asyncio.sleep(max(0, (RMS_SAMPLING_INTERVAL_MS / 1000.0) - processing_time))
+                # Sleep until an absolute deadline so per-tick overhead doesn't accumulate as drift
+                next_tick += interval_s * intervals
+                delay = next_tick - clock()
+                if delay > 0:
+                    await sleep(delay)
+                else:
+                    next_tick = clock() # Fell behind; resume pacing from now rather than catching up
 
     if play_audio and stream:
         stream.stop_stream()
@@ -100,6 +175,8 @@ async def stream_audio_and_calculate_rms(audio_file_path: str, play_audio: bool
 async def main():
     """
     Main function to demonstrate audio streaming and RMS calculation.
+
+    Run from the project root with: python -m Agent.RMS_Sampler
     """
     audio_sample_path = os.path.join(PROJECT_ROOT, "Audio Samples", "How to make bread.wav")
 
@@ -0,0 +1,122 @@
+// Optional precompiled (SIMD where available) kernels for the audio samplers, loaded through
+// ctypes by _audio_simd.py so no JIT compilation is needed at start-up.
+// Build from the project root with:
+//   gcc -O3 -march=native -shared -fPIC Agent/_audio_simd.c -o Agent/libaudiosimd.so -lm
+// The samplers fall back to their Numba kernels when the library isn't built.
+#include <stddef.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <math.h>
+
+#if defined(__AVX2__) && defined(__FMA__)
+#include <immintrin.h>
+#elif defined(__ARM_NEON) && defined(__aarch64__)
+#include <arm_neon.h>
+#endif
+
+// Samples accumulated in single precision before being folded into the double total,
+// keeping float32 rounding error negligible for long chunks.
+#define BLOCK_SAMPLES 4096
+
+// Returns the RMS of count int16 samples, normalised to [0.0, 1.0].
+double rms_int16(const int16_t *samples, size_t count) {
+    if (count == 0) {
+        return 0.0;
+    }
+
+    double total = 0.0;
+    size_t i = 0;
+
+#if defined(__AVX2__) && defined(__FMA__)
+    while (i + 16 <= count) {
+        size_t block_end = i + BLOCK_SAMPLES < count ? i + BLOCK_SAMPLES : count;
+        __m256 acc_lo = _mm256_setzero_ps();
+        __m256 acc_hi = _mm256_setzero_ps();
+        for (; i + 16 <= block_end; i += 16) {
+            __m256i raw = _mm256_loadu_si256((const __m256i *)(samples + i));
+            __m256 lo = _mm256_cvtepi32_ps(_mm256_cvtepi16_epi32(_mm256_castsi256_si128(raw)));
+            __m256 hi = _mm256_cvtepi32_ps(_mm256_cvtepi16_epi32(_mm256_extracti128_si256(raw, 1)));
+            acc_lo = _mm256_fmadd_ps(lo, lo, acc_lo);
+            acc_hi = _mm256_fmadd_ps(hi, hi, acc_hi);
+        }
+        __m256 acc = _mm256_add_ps(acc_lo, acc_hi);
+        __m128 sum = _mm_add_ps(_mm256_castps256_ps128(acc), _mm256_extractf128_ps(acc, 1));
+        sum = _mm_hadd_ps(sum, sum);
+        sum = _mm_hadd_ps(sum, sum);
+        total += _mm_cvtss_f32(sum);
+    }
+#elif defined(__ARM_NEON) && defined(__aarch64__)
+    while (i + 8 <= count) {
+        size_t block_end = i + BLOCK_SAMPLES < count ? i + BLOCK_SAMPLES : count;
+        float32x4_t acc_lo = vdupq_n_f32(0.0f);
+        float32x4_t acc_hi = vdupq_n_f32(0.0f);
+        for (; i + 8 <= block_end; i += 8) {
+            int16x8_t raw = vld1q_s16(samples + i);
+            float32x4_t lo = vcvtq_f32_s32(vmovl_s16(vget_low_s16(raw)));
+            float32x4_t hi = vcvtq_f32_s32(vmovl_s16(vget_high_s16(raw)));
+            acc_lo = vfmaq_f32(acc_lo, lo, lo);
+            acc_hi = vfmaq_f32(acc_hi, hi, hi);
+        }
+        total += vaddvq_f32(vaddq_f32(acc_lo, acc_hi));
+    }
+#endif
+
+    // Scalar tail, and the whole chunk on hosts without AVX2/FMA or NEON
+    for (; i < count; i++) {
+        double value = (double)samples[i];
+        total += value * value;
+    }
+
+    return sqrt(total / (double)count) / 32768.0;
+}
+
+// Writes the RMS of each consecutive interval of count float32 samples to out.
+// The last interval may be shorter than interval_size.
+void rms_per_interval_float32(const float *samples, size_t count, size_t interval_size, double *out) {
+    size_t index = 0;
+    for (size_t start = 0; start < count; start += interval_size, index++) {
+        size_t end = start + interval_size < count ? start + interval_size : count;
+        double total = 0.0;
+        for (size_t i = start; i < end; i++) {
+            double value = (double)samples[i];
+            total += value * value;
+        }
+        out[index] = sqrt(total / (double)(end - start));
+    }
+}
+
+// Picks the pitch in Hz from a YIN difference function over lags 0..max_lag, using the
+// first cumulative mean normalised difference dip below threshold, its local minimum,
+// and parabolic interpolation. Returns 0.0 when the chunk is unvoiced.
+double yin_pick_lag(const double *diff, size_t max_lag, int sample_rate, size_t min_lag, double threshold) {
+    double *cmnd = malloc((max_lag + 1) * sizeof(double));
+    if (cmnd == NULL) {
+        return 0.0;
+    }
+
+    double running = 0.0;
+    cmnd[0] = 1.0;
+    for (size_t lag = 1; lag <= max_lag; lag++) {
+        running += diff[lag];
+        cmnd[lag] = running > 0.0 ? diff[lag] * (double)lag / running : 1.0;
+    }
+
+    double pitch = 0.0;
+    for (size_t lag = min_lag; lag < max_lag; lag++) {
+        if (cmnd[lag] < threshold) {
+            while (lag + 1 < max_lag && cmnd[lag + 1] < cmnd[lag]) {
+                lag++;
+            }
+            double shift = 0.0;
+            double denom = cmnd[lag - 1] - 2.0 * cmnd[lag] + cmnd[lag + 1];
+            if (denom != 0.0) {
+                shift = 0.5 * (cmnd[lag - 1] - cmnd[lag + 1]) / denom;
+            }
+            pitch = (double)sample_rate / ((double)lag + shift);
+            break;
+        }
+    }
+
+    free(cmnd);
+    return pitch;
+}
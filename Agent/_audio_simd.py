@@ -0,0 +1,146 @@
+"""
+ctypes bindings for the optional precompiled audio kernels in _audio_simd.c.
+
+This is an optional build, not shipped with the repository (see the README). From the project root:
+    gcc -O3 -march=native -shared -fPIC Agent/_audio_simd.c -o Agent/libaudiosimd.so -lm  (Linux)
+    clang -O3 -shared -fPIC Agent/_audio_simd.c -o Agent/libaudiosimd.dylib -lm  (macOS)
+When it isn't built, the bindings are None and callers use their Numba kernels instead,
+which are compiled on first use.
+"""
+import ctypes
+import os
+import numpy as np
+from typing import Callable, Optional
+
+_LIBRARY_DIR = os.path.dirname(os.path.abspath(__file__))
+_LIBRARY_NAMES = ("libaudiosimd.so", "libaudiosimd.dylib", "audiosimd.dll")
+
+def _load_library() -> Optional[ctypes.CDLL]:
+    """
+    Loads the compiled kernel library from the Agent folder, if present.
+
+    Returns:
+        Optional[ctypes.CDLL]: The loaded library, or None if it isn't built or fails to load.
+    """
+    for name in _LIBRARY_NAMES:
+        path = os.path.join(_LIBRARY_DIR, name)
+        if os.path.exists(path):
+            try:
+                return ctypes.CDLL(path)
+            except OSError as e:
+                print(f"Could not load audio kernel library {path}: {e}")
+    return None
+
+def _bind_rms_int16(library: ctypes.CDLL) -> Callable[[bytes], float]:
+    """
+    Binds the library's rms_int16 function to a bytes-level wrapper.
+
+    Args:
+        library: The loaded kernel library.
+
+    Returns:
+        Callable[[bytes], float]: A function returning the normalised RMS of int16 PCM bytes.
+    """
+    kernel = library.rms_int16
+    kernel.argtypes = (ctypes.c_char_p, ctypes.c_size_t)
+    kernel.restype = ctypes.c_double
+
+    def rms_int16(audio_bytes: bytes) -> float:
+        """
+        Calculates the normalised RMS of int16 PCM bytes in one SIMD pass.
+
+        Args:
+            audio_bytes: Non-empty int16 PCM audio.
+
+        Returns:
+            float: The RMS value normalised to the range [0.0, 1.0].
+        """
+        return kernel(audio_bytes, len(audio_bytes) // 2)
+
+    return rms_int16
+
+def _bind_rms_per_interval_float32(library: ctypes.CDLL) -> Callable[[np.ndarray, int], np.ndarray]:
+    """
+    Binds the library's rms_per_interval_float32 function to an ndarray-level wrapper.
+
+    Args:
+        library: The loaded kernel library.
+
+    Returns:
+        Callable[[np.ndarray, int], np.ndarray]: A function returning the RMS of each interval of float32 samples.
+    """
+    kernel = library.rms_per_interval_float32
+    kernel.argtypes = (
+        np.ctypeslib.ndpointer(dtype=np.float32, flags='C_CONTIGUOUS'),
+        ctypes.c_size_t,
+        ctypes.c_size_t,
+        np.ctypeslib.ndpointer(dtype=np.float64, flags='C_CONTIGUOUS'),
+    )
+    kernel.restype = None
+
+    def rms_per_interval_float32(samples: np.ndarray, interval_size: int) -> np.ndarray:
+        """
+        Calculates the RMS of each consecutive interval of float32 samples.
+
+        Args:
+            samples: A non-empty, contiguous 1-D float32 array.
+            interval_size: The number of samples per interval; the last interval may be shorter.
+
+        Returns:
+            np.ndarray: The RMS value of each interval, in order.
+        """
+        rms_values = np.empty(-(-samples.size // interval_size))
+        kernel(samples, samples.size, interval_size, rms_values)
+        return rms_values
+
+    return rms_per_interval_float32
+
+def _bind_yin_pick_lag(library: ctypes.CDLL) -> Callable[[np.ndarray, int, int, float], float]:
+    """
+    Binds the library's yin_pick_lag function to an ndarray-level wrapper.
+
+    Args:
+        library: The loaded kernel library.
+
+    Returns:
+        Callable[[np.ndarray, int, int, float], float]: A function picking the pitch from a YIN difference function.
+    """
+    kernel = library.yin_pick_lag
+    kernel.argtypes = (
+        np.ctypeslib.ndpointer(dtype=np.float64, flags='C_CONTIGUOUS'),
+        ctypes.c_size_t,
+        ctypes.c_int,
+        ctypes.c_size_t,
+        ctypes.c_double,
+    )
+    kernel.restype = ctypes.c_double
+
+    def yin_pick_lag(diff: np.ndarray, sample_rate: int, min_lag: int, threshold: float) -> float:
+        """
+        Picks the pitch from a YIN difference function.
+
+        Args:
+            diff: The float64 difference function, indexed by lag.
+            sample_rate: The sample rate of the analysed samples.
+            min_lag: The smallest lag (highest pitch) to consider.
+            threshold: The cumulative mean normalised difference threshold for a voiced lag.
+
+        Returns:
+            float: The estimated pitch in Hz, or 0.0 if the chunk is unvoiced.
+        """
+        return kernel(diff, diff.size - 1, sample_rate, min_lag, threshold)
+
+    return yin_pick_lag
+
+_library = _load_library()
+rms_int16: Optional[Callable[[bytes], float]] = None
+rms_per_interval_float32: Optional[Callable[[np.ndarray, int], np.ndarray]] = None
+yin_pick_lag: Optional[Callable[[np.ndarray, int, int, float], float]] = None
+if _library is not None:
+    try:
+        rms_int16 = _bind_rms_int16(_library)
+        rms_per_interval_float32 = _bind_rms_per_interval_float32(_library)
+        yin_pick_lag = _bind_yin_pick_lag(_library)
+    except AttributeError as e:
+        # A library built from an older _audio_simd.c; rebuild it to use the newer kernels
+        print(f"Audio kernel library is missing a kernel, rebuild it: {e}")
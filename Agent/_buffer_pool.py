@@ -0,0 +1,75 @@
+"""
+Thread-safe pool of float32 buffers for the samplers' integer-to-float conversions.
+
+Only the standard analysis window sizes are pooled; other lengths are allocated fresh
+and dropped on release, so the pool never grows beyond a few buffers per size.
+"""
+import collections
+import contextlib
+import threading
+import numpy as np
+from typing import DefaultDict, Iterator, List
+from Agent.config import (
+    AUDIO_SEND_SAMPLE_RATE,
+    AUDIO_RECEIVE_SAMPLE_RATE,
+    RMS_SAMPLING_INTERVAL_MS
+)
+
+# One visualiser window at the microphone and speaker sample rates
+_STANDARD_SIZES = frozenset((
+    int(AUDIO_SEND_SAMPLE_RATE * RMS_SAMPLING_INTERVAL_MS / 1000),
+    int(AUDIO_RECEIVE_SAMPLE_RATE * RMS_SAMPLING_INTERVAL_MS / 1000),
+))
+# Idle buffers kept per size; more are only needed if several threads convert at once.
+_MAX_IDLE_PER_SIZE = 4
+
+_idle: DefaultDict[int, List[np.ndarray]] = collections.defaultdict(list)
+_lock = threading.Lock()
+
+def acquire(sample_count: int) -> np.ndarray:
+    """
+    Takes a float32 buffer of the given length from the pool, allocating if none is idle.
+
+    Args:
+        sample_count: The number of samples the buffer must hold.
+
+    Returns:
+        np.ndarray: A float32 array of exactly sample_count elements with undefined contents.
+    """
+    if sample_count in _STANDARD_SIZES:
+        with _lock:
+            idle = _idle[sample_count]
+            if idle:
+                return idle.pop()
+    return np.empty(sample_count, dtype=np.float32)
+
+def release(buffer: np.ndarray) -> None:
+    """
+    Returns a buffer obtained from acquire to the pool.
+
+    Args:
+        buffer: The buffer to return. It must not be used after release.
+    """
+    if buffer.size not in _STANDARD_SIZES:
+        return
+    with _lock:
+        idle = _idle[buffer.size]
+        if len(idle) < _MAX_IDLE_PER_SIZE:
+            idle.append(buffer)
+
+@contextlib.contextmanager
+def lease(sample_count: int) -> Iterator[np.ndarray]:
+    """
+    Lends a pooled float32 buffer for the duration of a with block.
+
+    Args:
+        sample_count: The number of samples the buffer must hold.
+
+    Yields:
+        np.ndarray: A float32 array of exactly sample_count elements.
+    """
+    buffer = acquire(sample_count)
+    try:
+        yield buffer
+    finally:
+        release(buffer)
@@ -1,4 +1,6 @@
 import os
+import struct
+import numpy as np
 import pyaudio
 from typing import List, Optional
 from google.genai import types
@@ -16,22 +18,36 @@ SYSTEM_PROMPT_PATH = os.path.join(SCRIPT_DIR, SYSTEM_PROMPT_FILENAME)
 # --- Application Structure Paths (relative to PROJECT_ROOT) ---
 VISUALISER_DIR_NAME = "Visualisation"
 VISUALISER_EXE_NAME = "Visualiser.out" # Changed from "visualiser"
+VISUALISER_LAUNCH_SCRIPT_NAME = "launch_visualiser.applescript" # macOS only
+VISUALISER_LAUNCH_SCRIPT_COMPILED_NAME = "launch_visualiser.scpt" # Optional, built with osacompile
 AGENT_DIR_NAME = "Agent" # For consistency, though SCRIPT_DIR is often used for this
-GEMINI_CLIENT_SCRIPT_NAME = "Gemini Client.py"
+GEMINI_CLIENT_SCRIPT_NAME = "gemini_client.py"
 AUDIO_SAMPLES_DIR_NAME = "Audio Samples"
 DEFAULT_SAMPLE_AUDIO_FILENAME = "How to make bread.wav"
 
 # --- Full Paths derived from PROJECT_ROOT ---
 VISUALISER_DIR = os.path.join(PROJECT_ROOT, VISUALISER_DIR_NAME)
 VISUALISER_EXE_PATH = os.path.join(VISUALISER_DIR, VISUALISER_EXE_NAME)
+VISUALISER_LAUNCH_SCRIPT_PATH = os.path.join(VISUALISER_DIR, VISUALISER_LAUNCH_SCRIPT_NAME)
+VISUALISER_LAUNCH_SCRIPT_COMPILED_PATH = os.path.join(VISUALISER_DIR, VISUALISER_LAUNCH_SCRIPT_COMPILED_NAME)
 AGENT_DIR = os.path.join(PROJECT_ROOT, AGENT_DIR_NAME)
 GEMINI_CLIENT_SCRIPT_PATH = os.path.join(AGENT_DIR, GEMINI_CLIENT_SCRIPT_NAME)
 AUDIO_SAMPLES_DIR = os.path.join(PROJECT_ROOT, AUDIO_SAMPLES_DIR_NAME)
 DEFAULT_SAMPLE_AUDIO_FILE = os.path.join(AUDIO_SAMPLES_DIR, DEFAULT_SAMPLE_AUDIO_FILENAME)
 
 # --- Visualiser Network Configurations ---
-VISUALISER_UDP_HOST = "localhost"
-VISUALISER_UDP_PORT = 12345
+# A numeric loopback address: no name lookup, and senders bind to it so nothing leaves the host.
+VISUALISER_UDP_HOST = "127.0.0.1"
+VISUALISER_UDP_PORT = 12345  # Must match PORT in visualiser.c
+# Visualiser message: little-endian float32 RMS followed by uint32 pitch in Hz (MESSAGE_SIZE in
+# visualiser.c). The record dtype is the same layout, for writing batches of messages at once.
+VISUALISER_MESSAGE = struct.Struct('<fI')
+VISUALISER_RECORD_DTYPE = np.dtype([('rms', '<f4'), ('pitch', '<u4')])
+# Kernel send buffer for visualiser datagrams, large enough to absorb bursts without blocking.
+VISUALISER_UDP_SNDBUF_BYTES: int = 1 << 20
+# Visualiser messages packed into each file-mode datagram. Batching cuts send calls but the
+# visualiser only draws the newest message, so values above 1 delay and thin out updates.
+VISUALISER_BATCH_RECORDS: int = 1
 
 # --- Audio Configurations ---
 AUDIO_FORMAT = pyaudio.paInt16
@@ -39,6 +55,23 @@ AUDIO_CHANNELS = 1
 AUDIO_SEND_SAMPLE_RATE = 16000
 AUDIO_RECEIVE_SAMPLE_RATE = 24000
 AUDIO_CHUNK_SIZE = 1024
+# Match the playback stream's buffer size to the device's default low-latency period instead of
+# AUDIO_CHUNK_SIZE, avoiding PortAudio re-buffering. AUDIO_CHUNK_SIZE remains the fallback.
+# Capture always uses AUDIO_CHUNK_SIZE, as each captured chunk costs one send to Gemini.
+AUDIO_USE_NATIVE_BUFFER_SIZE: bool = True
+# Captured audio held between the microphone callback and the sending task, in milliseconds.
+# The oldest chunk is dropped when full.
+AUDIO_CAPTURE_BUFFER_MS: int = 2048
+# Audio held between the playback task and the speaker callback, in milliseconds; playback waits
+# for space. Keep it a little above AUDIO_PLAYBACK_COALESCE_MS so the callback never runs dry.
+AUDIO_PLAYBACK_BUFFER_MS: int = 80
+# Maximum received audio awaiting playback, in milliseconds. Gemini streams a reply faster than
+# real time, so this must hold the unplayed remainder of a long reply; it only guards against
+# playback stalling. The oldest chunk is dropped (and logged) when full, and a warning is
+# printed once the backlog passes half this duration.
+AUDIO_OUTPUT_QUEUE_MAX_MS: int = 20000
+# Small received chunks are joined up to this much audio before being handed to playback.
+AUDIO_PLAYBACK_COALESCE_MS: int = 40
 # How often to sample audio RMS and send data to the ESP32 for display feedback
 # during playback of Gemini's voice.
 # Value is in milliseconds.
@@ -48,6 +81,13 @@ PITCH_SAMPLING_INTERVAL_MS: int = 100
 # --- Feature Toggles ---
 ENABLE_RMS_PROCESSING: bool = True
 ENABLE_PITCH_PROCESSING: bool = False
+# Pitch estimator: "yin" (single-pass, one estimate per chunk) or "pyin" (librosa, much slower).
+PITCH_DETECTION_METHOD: str = "yin"
+# YIN's cumulative mean normalised difference threshold; lower values are stricter about voicing.
+PITCH_YIN_THRESHOLD: float = 0.1
+# Maximum number of audio windows awaiting RMS/pitch analysis. When analysis falls
+# behind, the oldest window is dropped so capture and playback are never delayed.
+VISUALISER_ANALYSIS_QUEUE_MAXSIZE: int = 4
 
 # --- Gemini Model & API Configurations ---
 GEMINI_MODEL_NAME = "gemini-2.5-flash-preview-native-audio-dialog"
@@ -63,24 +103,30 @@ GEMINI_TOOLS = [
     types.Tool(google_search=types.GoogleSearch()),
 ]
 
-SYSTEM_PROMPT = get_contextual_system_prompt() # Use the new function
+def build_live_connect_config() -> types.LiveConnectConfig:
+    """
+    Builds the Gemini Live session configuration with a fresh date and time in the system prompt.
 
+    Call this when opening each session; the System Prompt.md body itself is only read once.
 
-GEMINI_LIVE_CONNECT_CONFIG = types.LiveConnectConfig(
-    response_modalities=GEMINI_RESPONSE_MODALITIES,
-    speech_config=types.SpeechConfig(
-        voice_config=types.VoiceConfig(
-            prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=GEMINI_VOICE_NAME)
-        )
-    ),
-    tools=GEMINI_TOOLS,
-    media_resolution=GEMINI_MEDIA_RESOLUTION,
-    context_window_compression=types.ContextWindowCompressionConfig(
-        trigger_tokens=GEMINI_CONTEXT_TRIGGER_TOKENS,
-        sliding_window=types.SlidingWindow(target_tokens=GEMINI_CONTEXT_SLIDING_WINDOW_TARGET_TOKENS),
-    ),
-    system_instruction=types.Content(
-        parts=[types.Part.from_text(text=SYSTEM_PROMPT)],
-        role="user"
-    ),
-)
+    Returns:
+        types.LiveConnectConfig: The configuration for a new Live API session.
+    """
+    return types.LiveConnectConfig(
+        response_modalities=GEMINI_RESPONSE_MODALITIES,
+        speech_config=types.SpeechConfig(
+            voice_config=types.VoiceConfig(
+                prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=GEMINI_VOICE_NAME)
+            )
+        ),
+        tools=GEMINI_TOOLS,
+        media_resolution=GEMINI_MEDIA_RESOLUTION,
+        context_window_compression=types.ContextWindowCompressionConfig(
+            trigger_tokens=GEMINI_CONTEXT_TRIGGER_TOKENS,
+            sliding_window=types.SlidingWindow(target_tokens=GEMINI_CONTEXT_SLIDING_WINDOW_TARGET_TOKENS),
+        ),
+        system_instruction=types.Content(
+            parts=[types.Part.from_text(text=get_contextual_system_prompt())],
+            role="user"
+        ),
+    )
@@ -0,0 +1,724 @@
+"""
+Handles all interactions with the Google Gemini API for audio and text.
+
+Run from the project root with: python -m Agent.gemini_client
+"""
+
+import sys
+import os
+import asyncio
+import collections
+import concurrent.futures
+import contextvars
+import functools
+import socket
+import traceback
+from typing import Callable, Deque, Dict, Any, List, Optional, Tuple, TypeVar
+
+import pyaudio
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+# Import configurations from config.py
+from Agent.config import (
+    ENV_FILE_PATH,
+    AUDIO_FORMAT,
+    AUDIO_CHANNELS,
+    AUDIO_SEND_SAMPLE_RATE,
+    AUDIO_RECEIVE_SAMPLE_RATE,
+    AUDIO_CHUNK_SIZE,
+    AUDIO_USE_NATIVE_BUFFER_SIZE,
+    AUDIO_CAPTURE_BUFFER_MS,
+    AUDIO_PLAYBACK_BUFFER_MS,
+    AUDIO_OUTPUT_QUEUE_MAX_MS,
+    AUDIO_PLAYBACK_COALESCE_MS,
+    VISUALISER_ANALYSIS_QUEUE_MAXSIZE,
+    RMS_SAMPLING_INTERVAL_MS,
+    GEMINI_MODEL_NAME,
+    GEMINI_API_VERSION,
+    VISUALISER_UDP_HOST,
+    VISUALISER_UDP_PORT,
+    VISUALISER_UDP_SNDBUF_BYTES,
+    VISUALISER_MESSAGE,
+    ENABLE_RMS_PROCESSING,
+    ENABLE_PITCH_PROCESSING,
+    build_live_connect_config
+)
+from Agent.RMS_Sampler import calculate_rms_from_bytes
+from Agent.Pitch_Sampler import calculate_pitch_from_bytes
+
+load_dotenv(ENV_FILE_PATH)
+
+_MIC_MIME = "audio/pcm"
+# When neither analysis is enabled the visualiser path is skipped entirely.
+_VIS_ENABLED = ENABLE_RMS_PROCESSING or ENABLE_PITCH_PROCESSING
+# Streamed text is printed in batches of at least this many characters, or at the end of a turn.
+_TEXT_FLUSH_CHARS = 80
+
+if sys.version_info < (3, 11, 0):
+    import taskgroup
+    import exceptiongroup
+
+    asyncio.TaskGroup = taskgroup.TaskGroup # type: ignore
+    asyncio.ExceptionGroup = exceptiongroup.ExceptionGroup # type: ignore
+
+
+_T = TypeVar("_T")
+
+
+def _native_frames_per_buffer(latency_s: float, sample_rate: int) -> int:
+    """
+    Derives a buffer size matching a device's native latency period, snapped to a multiple of 32 frames.
+
+    Args:
+        latency_s: The device's default low latency in seconds.
+        sample_rate: The stream's sample rate.
+
+    Returns:
+        int: The buffer size in frames, or AUDIO_CHUNK_SIZE if native sizing is disabled or unavailable.
+    """
+    if not AUDIO_USE_NATIVE_BUFFER_SIZE:
+        return AUDIO_CHUNK_SIZE
+    frames: int = int(round(latency_s * sample_rate / 32)) * 32
+    return frames if frames > 0 else AUDIO_CHUNK_SIZE
+
+
+def _pitch_or_zero(window: bytes, sample_rate: int) -> int:
+    """
+    Calculates the pitch of an audio window, reporting 0 Hz if detection fails.
+
+    Args:
+        window: The audio window in bytes.
+        sample_rate: The sample rate of the audio window.
+
+    Returns:
+        int: The pitch in Hz, or 0 on failure.
+    """
+    try:
+        return calculate_pitch_from_bytes(window, sample_rate=sample_rate, audio_format=AUDIO_FORMAT)
+    except Exception as e:
+        print(f"Error calculating pitch for visualiser: {e}")
+        return 0
+
+
+def _analyse_rms(window: bytes, sample_rate: int) -> Tuple[float, int]:
+    """
+    Calculates only the RMS of an audio window for the visualiser.
+
+    Args:
+        window: The audio window in bytes.
+        sample_rate: The sample rate of the audio window.
+
+    Returns:
+        Tuple[float, int]: The RMS value and a pitch of 0 Hz.
+    """
+    return calculate_rms_from_bytes(window), 0
+
+
+def _analyse_pitch(window: bytes, sample_rate: int) -> Tuple[float, int]:
+    """
+    Calculates only the pitch of an audio window for the visualiser.
+
+    Args:
+        window: The audio window in bytes.
+        sample_rate: The sample rate of the audio window.
+
+    Returns:
+        Tuple[float, int]: An RMS of 0.0 and the pitch in Hz.
+    """
+    return 0.0, _pitch_or_zero(window, sample_rate)
+
+
+def _analyse_rms_and_pitch(window: bytes, sample_rate: int) -> Tuple[float, int]:
+    """
+    Calculates both the RMS and pitch of an audio window for the visualiser.
+
+    Args:
+        window: The audio window in bytes.
+        sample_rate: The sample rate of the audio window.
+
+    Returns:
+        Tuple[float, int]: The RMS value and the pitch in Hz.
+    """
+    return calculate_rms_from_bytes(window), _pitch_or_zero(window, sample_rate)
+
+
+# Keyed by (ENABLE_RMS_PROCESSING, ENABLE_PITCH_PROCESSING); (False, False) never reaches analysis.
+_WINDOW_ANALYSERS: Dict[Tuple[bool, bool], Callable[[bytes, int], Tuple[float, int]]] = {
+    (True, False): _analyse_rms,
+    (False, True): _analyse_pitch,
+    (True, True): _analyse_rms_and_pitch,
+}
+
+
+def _put_nowait_drop_oldest(queue: asyncio.Queue, item: Any) -> bool:
+    """
+    Puts an item on a queue without waiting, discarding the oldest item if the queue is full.
+
+    Args:
+        queue: The queue to put the item on.
+        item: The item to enqueue.
+
+    Returns:
+        bool: True if an older item was discarded to make room.
+    """
+    try:
+        queue.put_nowait(item)
+        return False
+    except asyncio.QueueFull:
+        queue.get_nowait()
+        queue.task_done()
+        queue.put_nowait(item)
+        return True
+
+
+class GeminiClient:
+    """
+    Manages audio input/output and communication with the Gemini API.
+    """
+
+    def __init__(self, vis_transport: Optional[asyncio.DatagramTransport] = None) -> None:
+        """
+        Initialises the GeminiClient with necessary audio interfaces and API configuration.
+
+        Args:
+            vis_transport: A datagram transport already connected to the visualiser. If omitted,
+                the client opens (and later closes) its own when visualiser processing is enabled.
+
+        Raises:
+            ValueError: If the GEMINI_API_KEY environment variable is not set.
+        """
+        self._pya: pyaudio.PyAudio = pyaudio.PyAudio()
+        api_key: Optional[str] = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables. Make sure it's set in your .env file.")
+        self._client: genai.Client = genai.Client(
+            http_options={"api_version": GEMINI_API_VERSION},
+            api_key=api_key,
+        )
+
+        self._vis_transport: Optional[asyncio.DatagramTransport] = vis_transport
+        self._owns_vis_transport: bool = vis_transport is None
+
+        # Blocking audio work runs on its own small pool rather than the shared default executor.
+        self._audio_executor: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="audio"
+        )
+
+        # Audio is analysed for the visualiser once per RMS_SAMPLING_INTERVAL_MS window
+        # rather than once per chunk, so chunks are accumulated until a window is full.
+        sample_width: int = self._pya.get_sample_size(AUDIO_FORMAT) * AUDIO_CHANNELS
+        self._frame_bytes: int = sample_width
+        self._mic_vis_window_bytes: int = int(AUDIO_SEND_SAMPLE_RATE * RMS_SAMPLING_INTERVAL_MS / 1000) * sample_width
+        self._speaker_vis_window_bytes: int = int(AUDIO_RECEIVE_SAMPLE_RATE * RMS_SAMPLING_INTERVAL_MS / 1000) * sample_width
+        self._playback_coalesce_bytes: int = int(AUDIO_RECEIVE_SAMPLE_RATE * AUDIO_PLAYBACK_COALESCE_MS / 1000) * sample_width
+        self._playback_buffer_bytes: int = int(AUDIO_RECEIVE_SAMPLE_RATE * AUDIO_PLAYBACK_BUFFER_MS / 1000) * sample_width
+        self._output_queue_max_bytes: int = int(AUDIO_RECEIVE_SAMPLE_RATE * AUDIO_OUTPUT_QUEUE_MAX_MS / 1000) * sample_width
+        self._receive_bytes_per_ms: float = AUDIO_RECEIVE_SAMPLE_RATE * sample_width / 1000
+        self._mic_vis_accum: bytearray = bytearray()
+        self._speaker_vis_accum: bytearray = bytearray()
+        self._analysis_queue: Optional[asyncio.Queue[Tuple[bytes, int]]] = None
+
+        # Built per session in run_conversation so the system prompt's date and time are current
+        self.CONFIG: Optional[types.LiveConnectConfig] = None
+
+        # Received audio awaiting playback, bounded by duration (tracked in bytes) by dropping the
+        # oldest chunks, and emptied in one call when the model is interrupted.
+        self._audio_output_buffer: Deque[bytes] = collections.deque()
+        self._audio_output_bytes: int = 0
+        self._audio_output_ready: Optional[asyncio.Event] = None
+        self._output_backlog_warned: bool = False
+
+        self._session: Optional[Any] = None
+        # Streams are opened once by _ensure_streams and reused across conversations;
+        # they are only closed by close(), once the owner has finished with the client.
+        self._mic_info: Optional[Dict[str, Any]] = None
+        self._speaker_info: Optional[Dict[str, Any]] = None
+        self._output_frames_per_buffer: int = AUDIO_CHUNK_SIZE
+        self._input_audio_stream: Optional[pyaudio.Stream] = None
+        self._output_audio_stream: Optional[pyaudio.Stream] = None
+
+        # PyAudio runs the streams in callback mode; the callbacks execute on PortAudio's
+        # thread and exchange audio with the event loop through these deques.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # The capture deque is bounded by duration; each callback delivers AUDIO_CHUNK_SIZE frames.
+        capture_chunks: int = max(1, -(-AUDIO_SEND_SAMPLE_RATE * AUDIO_CAPTURE_BUFFER_MS // (1000 * AUDIO_CHUNK_SIZE)))
+        self._mic_buffer: Deque[bytes] = collections.deque(maxlen=capture_chunks)
+        self._mic_data_ready: Optional[asyncio.Event] = None
+        self._speaker_buffer: Deque[bytes] = collections.deque()
+        # Bytes in _speaker_buffer, only updated on the event loop thread.
+        self._speaker_buffered_bytes: int = 0
+        self._speaker_pending: bytearray = bytearray()
+        self._speaker_space_ready: Optional[asyncio.Event] = None
+
+    async def _in_audio_thread(self, func: Callable[..., _T], *args: Any) -> _T:
+        """
+        Runs a blocking function on the dedicated audio executor.
+
+        Like asyncio.to_thread, the current context is propagated, but the copy_context()
+        wrapping is skipped when there is nothing to propagate.
+
+        Args:
+            func: The blocking function to run.
+            *args: Positional arguments for the function.
+
+        Returns:
+            _T: The function's return value.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        ctx: contextvars.Context = contextvars.copy_context()
+        if not ctx:
+            return await loop.run_in_executor(self._audio_executor, func, *args)
+        return await loop.run_in_executor(self._audio_executor, functools.partial(ctx.run, func, *args))
+
+    def _update_visualiser(self, accum: bytearray, data: bytes, window_bytes: int, sample_rate: int) -> None:
+        """
+        Accumulates an audio chunk and queues a full window for visualiser analysis.
+
+        Only the most recent complete window is queued; older complete windows are discarded
+        so the visualiser never lags behind the audio when chunks are larger than a window.
+
+        Args:
+            accum: The accumulation buffer for this audio direction.
+            data: The audio chunk to append.
+            window_bytes: The size of one analysis window in bytes.
+            sample_rate: The sample rate of the audio in this buffer.
+        """
+        accum.extend(data)
+        if len(accum) < window_bytes:
+            return
+
+        window_end: int = (len(accum) // window_bytes) * window_bytes
+        window: bytes = bytes(accum[window_end - window_bytes:window_end])
+        del accum[:window_end]
+        _put_nowait_drop_oldest(self._analysis_queue, (window, sample_rate))
+
+    async def _analyse_audio(self) -> None:
+        """
+        Analyses queued audio windows off the capture and playback paths and sends the results to the visualiser.
+        """
+        if self._analysis_queue is None or self._vis_transport is None:
+            print("Error: Analysis queue or visualiser transport not initialised.")
+            return
+
+        # The analysis body is chosen once from the feature flags so the loop carries no per-window
+        # branching. RMS alone is cheap enough to run inline; anything involving pitch is offloaded.
+        analyse_window: Callable[[bytes, int], Tuple[float, int]] = _WINDOW_ANALYSERS[
+            (ENABLE_RMS_PROCESSING, ENABLE_PITCH_PROCESSING)
+        ]
+        analysis_get = self._analysis_queue.get
+        analysis_task_done = self._analysis_queue.task_done
+        in_audio_thread = self._in_audio_thread
+        vis_send = self._vis_transport.sendto
+        # Each datagram is packed into the same buffer. The transport either sends it at once
+        # or copies it into its own backlog, so the buffer is free again as soon as sendto returns.
+        vis_buf: bytearray = bytearray(VISUALISER_MESSAGE.size)
+        vis_pack_into = VISUALISER_MESSAGE.pack_into
+
+        try:
+            if ENABLE_PITCH_PROCESSING:
+                while True:
+                    window, sample_rate = await analysis_get()
+                    rms_value, pitch_value = await in_audio_thread(analyse_window, window, sample_rate)
+                    analysis_task_done()
+                    vis_pack_into(vis_buf, 0, rms_value, pitch_value)
+                    vis_send(vis_buf)
+            else:
+                while True:
+                    window, sample_rate = await analysis_get()
+                    rms_value, pitch_value = analyse_window(window, sample_rate)
+                    analysis_task_done()
+                    vis_pack_into(vis_buf, 0, rms_value, pitch_value)
+                    vis_send(vis_buf)
+        except asyncio.CancelledError:
+            print("Audio analysis task cancelled.")
+
+    def _microphone_callback(
+        self, in_data: Optional[bytes], frame_count: int, time_info: Dict[str, float], status: int
+    ) -> Tuple[None, int]:
+        """
+        Receives captured audio on the PortAudio thread and hands it to the event loop.
+
+        Args:
+            in_data: The captured audio bytes.
+            frame_count: The number of frames in the buffer.
+            time_info: PortAudio timing information for the buffer.
+            status: PortAudio status flags for the buffer.
+
+        Returns:
+            Tuple[None, int]: No output data and the flag to keep the stream running.
+        """
+        if in_data:
+            self._mic_buffer.append(in_data)
+            self._loop.call_soon_threadsafe(self._mic_data_ready.set)
+        return None, pyaudio.paContinue
+
+    def _speaker_callback(
+        self, in_data: Optional[bytes], frame_count: int, time_info: Dict[str, float], status: int
+    ) -> Tuple[bytes, int]:
+        """
+        Supplies buffered playback audio to PortAudio, padding with silence when none is queued.
+
+        Args:
+            in_data: Unused for output-only streams.
+            frame_count: The number of frames PortAudio requires.
+            time_info: PortAudio timing information for the buffer.
+            status: PortAudio status flags for the buffer.
+
+        Returns:
+            Tuple[bytes, int]: The audio to play and the flag to keep the stream running.
+        """
+        needed: int = frame_count * self._frame_bytes
+        pending: bytearray = self._speaker_pending
+        taken: int = 0
+        while len(pending) < needed and self._speaker_buffer:
+            chunk: bytes = self._speaker_buffer.popleft()
+            pending.extend(chunk)
+            taken += len(chunk)
+
+        played: bytes = bytes(pending[:needed])
+        del pending[:needed]
+        out: bytes = played if len(played) == needed else played + bytes(needed - len(played))
+
+        self._loop.call_soon_threadsafe(self._speaker_consumed, taken, played)
+        return out, pyaudio.paContinue
+
+    def _speaker_consumed(self, taken: int, played: bytes) -> None:
+        """
+        Accounts for audio the speaker callback has taken and feeds what it played to the visualiser.
+
+        Runs on the event loop, so the visualiser follows the audio as it is heard rather than
+        as it is queued.
+
+        Args:
+            taken: The bytes the callback removed from the playback deque.
+            played: The audio (excluding silence padding) handed to PortAudio.
+        """
+        # Clamped, as an interruption may have cleared the deque after the callback took from it
+        self._speaker_buffered_bytes = max(0, self._speaker_buffered_bytes - taken)
+        self._speaker_space_ready.set()
+        if _VIS_ENABLED and played:
+            self._update_visualiser(
+                self._speaker_vis_accum, played, self._speaker_vis_window_bytes, AUDIO_RECEIVE_SAMPLE_RATE
+            )
+
+    async def _ensure_streams(self) -> None:
+        """
+        Opens the microphone and speaker streams on first use and prepares the callback state for this event loop.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._mic_data_ready = asyncio.Event()
+        self._speaker_space_ready = asyncio.Event()
+
+        if self._mic_info is None:
+            self._mic_info = self._pya.get_default_input_device_info()
+        if self._speaker_info is None:
+            self._speaker_info = self._pya.get_default_output_device_info()
+            self._output_frames_per_buffer = _native_frames_per_buffer(
+                self._speaker_info["defaultLowOutputLatency"], AUDIO_RECEIVE_SAMPLE_RATE
+            )
+
+        if self._input_audio_stream is None:
+            self._input_audio_stream = await self._in_audio_thread(functools.partial(
+                self._pya.open,
+                format=AUDIO_FORMAT,
+                channels=AUDIO_CHANNELS,
+                rate=AUDIO_SEND_SAMPLE_RATE,
+                input=True,
+                input_device_index=self._mic_info["index"],
+                # Every captured chunk is sent to Gemini individually, so capture keeps
+                # AUDIO_CHUNK_SIZE frames rather than the smaller native buffer size
+                frames_per_buffer=AUDIO_CHUNK_SIZE,
+                stream_callback=self._microphone_callback,
+                start=False,
+            ))
+
+        if self._output_audio_stream is None:
+            self._output_audio_stream = await self._in_audio_thread(functools.partial(
+                self._pya.open,
+                format=AUDIO_FORMAT,
+                channels=AUDIO_CHANNELS,
+                rate=AUDIO_RECEIVE_SAMPLE_RATE,
+                output=True,
+                output_device_index=self._speaker_info["index"],
+                frames_per_buffer=self._output_frames_per_buffer,
+                stream_callback=self._speaker_callback,
+                start=False,
+            ))
+
+    def _close_streams(self) -> None:
+        """
+        Closes the persistent microphone and speaker streams.
+        """
+        for stream in (self._input_audio_stream, self._output_audio_stream):
+            if stream:
+                if stream.is_active():
+                    stream.stop_stream()
+                stream.close()
+        self._input_audio_stream = None
+        self._output_audio_stream = None
+
+    async def _listen_to_microphone(self) -> None:
+        """
+        Captures audio from the microphone and sends it straight to the Gemini API.
+        """
+        if self._session is None or self._input_audio_stream is None:
+            print("Error: Session or microphone stream is not initialised.")
+            return
+
+        self._mic_buffer.clear()
+        await self._in_audio_thread(self._input_audio_stream.start_stream)
+
+        # Bind hot-path attributes to locals once rather than looking them up per chunk.
+        # If sending falls behind, the bounded capture deque drops the oldest audio.
+        mic_buffer: Deque[bytes] = self._mic_buffer
+        mic_pop = mic_buffer.popleft
+        data_ready_wait = self._mic_data_ready.wait
+        data_ready_clear = self._mic_data_ready.clear
+        send_realtime_input = self._session.send_realtime_input
+        update_visualiser = self._update_visualiser
+        vis_accum: bytearray = self._mic_vis_accum
+        vis_window_bytes: int = self._mic_vis_window_bytes
+
+        print("Listening...")
+        try:
+            while True:
+                await data_ready_wait()
+                data_ready_clear()
+                while mic_buffer:
+                    data: bytes = mic_pop()
+                    await send_realtime_input(audio={"data": data, "mime_type": _MIC_MIME})
+                    if _VIS_ENABLED:
+                        update_visualiser(vis_accum, data, vis_window_bytes, AUDIO_SEND_SAMPLE_RATE)
+
+        except asyncio.CancelledError:
+            print("Microphone listening task cancelled.")
+        except Exception as e:
+            print(f"Error sending audio to Gemini: {e}")
+            traceback.print_exc()
+        finally:
+            self._input_audio_stream.stop_stream()
+            print("Microphone stream stopped.")
+
+    def _queue_output_audio(self, audio_data: bytes) -> None:
+        """
+        Queues received audio for playback, dropping the oldest chunks if the buffer would exceed AUDIO_OUTPUT_QUEUE_MAX_MS.
+
+        Args:
+            audio_data: The audio bytes received from Gemini.
+        """
+        output_buffer: Deque[bytes] = self._audio_output_buffer
+        output_buffer.append(audio_data)
+        self._audio_output_bytes += len(audio_data)
+        self._audio_output_ready.set()
+
+        while self._audio_output_bytes > self._output_queue_max_bytes and len(output_buffer) > 1:
+            dropped: int = len(output_buffer.popleft())
+            self._audio_output_bytes -= dropped
+            print(f"Warning: playback backlog over {AUDIO_OUTPUT_QUEUE_MAX_MS} ms; "
+                  f"dropped {dropped / self._receive_bytes_per_ms:.0f} ms of the oldest audio.")
+
+        backlogged: bool = self._audio_output_bytes > self._output_queue_max_bytes // 2
+        if backlogged and not self._output_backlog_warned:
+            print(f"Warning: audio playback backlog exceeds {AUDIO_OUTPUT_QUEUE_MAX_MS // 2} ms.")
+        self._output_backlog_warned = backlogged
+
+    async def _receive_from_gemini(self) -> None:
+        """
+        Receives audio and text from Gemini, puts audio into the output buffer, and prints text.
+        """
+        if self._audio_output_ready is None or self._session is None:
+            print("Error: Audio output buffer or session not initialised for receiving.")
+            return
+
+        print("Receiving from Gemini...")
+        try:
+            text_parts: List[str] = []
+            text_length: int = 0
+            while True:
+                turn: Any = self._session.receive()
+                async for response in turn:
+                    if audio_data := response.data:
+                        self._queue_output_audio(audio_data)
+                    if text_data := response.text:
+                        text_parts.append(text_data)
+                        text_length += len(text_data)
+                        if text_length >= _TEXT_FLUSH_CHARS:
+                            print("".join(text_parts), end="", flush=True)
+                            text_parts.clear()
+                            text_length = 0
+
+                if text_parts:
+                    print("".join(text_parts), end="", flush=True)
+                    text_parts.clear()
+                    text_length = 0
+
+                # If you interrupt the model, it sends a turn_complete.
+                # For interruptions to work, we need to stop playback.
+                # So empty out the audio buffers because they may have loaded
+                # much more audio than has played yet.
+                self._audio_output_buffer.clear()
+                self._audio_output_bytes = 0
+                self._speaker_buffer.clear()
+                self._speaker_buffered_bytes = 0
+
+        except asyncio.CancelledError:
+            print("Receiving from Gemini cancelled.")
+        except Exception as e:
+            print(f"Error receiving from Gemini: {e}")
+            traceback.print_exc()
+
+    async def _play_received_audio(self) -> None:
+        """
+        Plays audio from the output buffer using the speaker.
+        """
+        if self._audio_output_ready is None or self._output_audio_stream is None:
+            print("Error: Audio output buffer or speaker stream is not initialised.")
+            return
+
+        self._speaker_buffer.clear()
+        self._speaker_buffered_bytes = 0
+        self._speaker_pending.clear()
+        await self._in_audio_thread(self._output_audio_stream.start_stream)
+
+        try:
+            # Bind hot-path attributes to locals once rather than looking them up per chunk.
+            speaker_buffer: Deque[bytes] = self._speaker_buffer
+            speaker_append = speaker_buffer.append
+            space_ready_wait = self._speaker_space_ready.wait
+            space_ready_clear = self._speaker_space_ready.clear
+            output_buffer: Deque[bytes] = self._audio_output_buffer
+            output_pop = output_buffer.popleft
+            output_ready_wait = self._audio_output_ready.wait
+            output_ready_clear = self._audio_output_ready.clear
+            coalesce_bytes: int = self._playback_coalesce_bytes
+            buffer_bytes: int = self._playback_buffer_bytes
+
+            print("Audio playback started.")
+            while True:
+                while not output_buffer:
+                    output_ready_clear()
+                    await output_ready_wait()
+                audio_chunk_bytes: bytes = output_pop()
+                # Join any further queued chunks so playback receives fewer, larger buffers.
+                if len(audio_chunk_bytes) < coalesce_bytes and output_buffer:
+                    coalesced: bytearray = bytearray(audio_chunk_bytes)
+                    while len(coalesced) < coalesce_bytes and output_buffer:
+                        coalesced.extend(output_pop())
+                    audio_chunk_bytes = bytes(coalesced)
+                self._audio_output_bytes -= len(audio_chunk_bytes)
+                # Wait for the callback to consume audio rather than letting the buffer grow unbounded.
+                # A chunk larger than the whole buffer is still accepted once the buffer is empty.
+                while self._speaker_buffered_bytes and self._speaker_buffered_bytes + len(audio_chunk_bytes) > buffer_bytes:
+                    space_ready_clear()
+                    await space_ready_wait()
+                speaker_append(audio_chunk_bytes)
+                self._speaker_buffered_bytes += len(audio_chunk_bytes)
+
+        except asyncio.CancelledError:
+            print("Audio playback task cancelled.")
+        finally:
+            self._output_audio_stream.stop_stream()
+            print("Audio playback stream stopped.")
+
+    async def run_conversation(self) -> None:
+        """
+        Runs the main conversation loop, managing all asynchronous tasks.
+        """
+        self.CONFIG = build_live_connect_config()
+        self._audio_output_buffer.clear()
+        self._audio_output_bytes = 0
+        self._audio_output_ready = asyncio.Event()
+        self._analysis_queue = asyncio.Queue(maxsize=VISUALISER_ANALYSIS_QUEUE_MAXSIZE)
+
+        try:
+            if _VIS_ENABLED and self._vis_transport is None:
+                self._vis_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                    asyncio.DatagramProtocol,
+                    local_addr=(VISUALISER_UDP_HOST, 0),
+                    remote_addr=(VISUALISER_UDP_HOST, VISUALISER_UDP_PORT),
+                )
+                # The transport's socket is already non-blocking; a larger send buffer means
+                # bursts are absorbed by the kernel rather than queued in the transport.
+                try:
+                    self._vis_transport.get_extra_info("socket").setsockopt(
+                        socket.SOL_SOCKET, socket.SO_SNDBUF, VISUALISER_UDP_SNDBUF_BYTES
+                    )
+                except OSError as e:
+                    print(f"Could not enlarge visualiser send buffer: {e}")
+            await self._ensure_streams()
+
+            async with (
+                self._client.aio.live.connect(model=GEMINI_MODEL_NAME, config=self.CONFIG) as session,
+                asyncio.TaskGroup() as tg,
+            ):
+                self._session = session
+                print("Gemini session started.")
+
+                mic_task: asyncio.Task[None] = tg.create_task(self._listen_to_microphone())
+                receive_task: asyncio.Task[None] = tg.create_task(self._receive_from_gemini())
+                play_task: asyncio.Task[None] = tg.create_task(self._play_received_audio())
+                tasks: List[asyncio.Task[None]] = [mic_task, receive_task, play_task]
+                if _VIS_ENABLED:
+                    tasks.append(tg.create_task(self._analyse_audio()))
+
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        except asyncio.CancelledError:
+            print("Conversation run cancelled.")
+        except asyncio.ExceptionGroup as eg: # type: ignore
+            print("Exception group caught in run_conversation:")
+            traceback.print_exception(eg)
+        except Exception as e:
+            print(f"An unexpected error occurred in run_conversation: {e}")
+            traceback.print_exc()
+        finally:
+            if self._vis_transport and self._owns_vis_transport:
+                self._vis_transport.close()
+                self._vis_transport = None
+            # Audio streams stay open here so the next conversation can reuse them.
+            print("Conversation ended.")
+
+    def close(self) -> None:
+        """
+        Closes the audio streams, stops the audio executor and terminates PyAudio.
+
+        Call once when the client is no longer needed; it cannot run further conversations afterwards.
+        """
+        print("Cleaning up PyAudio...")
+        self._close_streams()
+        self._audio_executor.shutdown(wait=False, cancel_futures=True)
+        self._pya.terminate()
+        print("PyAudio terminated. Exiting.")
+
+
+async def run(vis_transport: Optional[asyncio.DatagramTransport] = None) -> None:
+    """
+    Runs a Gemini conversation until it ends or is cancelled.
+
+    Args:
+        vis_transport: A datagram transport already connected to the visualiser, shared by a caller
+            running the client in its own event loop. If omitted, the client opens its own.
+    """
+    client: Optional[GeminiClient] = None
+    try:
+        client = GeminiClient(vis_transport)
+        await client.run_conversation()
+    except KeyboardInterrupt:
+        print("\nShutting down Gemini Client...")
+    except Exception as e:
+        print(f"An error occurred in the Gemini Client: {e}")
+        traceback.print_exc()
+    finally:
+        if client is not None:
+            client.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.get_event_loop().run_until_complete(run())
+    except KeyboardInterrupt:
+        print("\nExiting main program...")
+    except Exception as e:
+        print(f"Critical error in application startup: {e}")
+        traceback.print_exc()
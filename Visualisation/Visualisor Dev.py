@@ -1,6 +1,5 @@
 import sys
 import os
-import platform
 from typing import AsyncGenerator
 
 # Add the project root directory to the Python path
@@ -13,6 +12,8 @@ from Agent.RMS_Sampler import stream_audio_and_calculate_rms
 MAX_RMS_FOR_BAR = 0.4  # Estimated maximum RMS value for scaling the bar
 BAR_WIDTH = 40  # Width of the RMS visualisation bar in characters
 BAR_CHAR = '█' # Character to use for the bar
+# Every possible bar, indexed by its length, so rendering a tick is a lookup rather than string building
+_BAR_LOOKUP = tuple(BAR_CHAR * i + ' ' * (BAR_WIDTH - i) for i in range(BAR_WIDTH + 1))
 
 async def process_audio() -> None:
     """
@@ -21,34 +22,25 @@ async def process_audio() -> None:
     audio_file_path = "/Users/will/Documents/Software Development/Françoise AI Secretary/Audio Samples/Introduction.wav"
     
     print(f"Starting audio processing for: {audio_file_path}")
+    print("---YOU ARE NOW CONNECTED TO FRANÇOISE---")
     async for rms in stream_audio_and_calculate_rms(audio_file_path, play_audio=True):
         render_audio(rms_value=rms)
+    sys.stdout.write("\n" + "-" * BAR_WIDTH + "\n")
     print("Finished audio processing.")
 
 
-def clear_terminal() -> None:
-    """
-    Clears the terminal screen based on the operating system.
-    """
-    if platform.system() == "Windows":
-        os.system('cls')
-    else:
-        os.system('clear')
-
 def render_audio(rms_value: float) -> None:
     """
-    Renders audio visualisation based on the RMS value.
+    Renders audio visualisation based on the RMS value, redrawing the bar line in place.
     
     Args:
         rms_value: The RMS value to render as a visualisation bar.
     """
-    clear_terminal() 
-    print("---YOU ARE NOW CONNECTED TO FRANÇOISE---")
     scaled_rms = min(max(rms_value, 0), MAX_RMS_FOR_BAR) / MAX_RMS_FOR_BAR 
     bar_length = int(scaled_rms * BAR_WIDTH)
-    rms_bar = BAR_CHAR * bar_length + ' ' * (BAR_WIDTH - bar_length)
-    print(f"{rms_bar}")
-    print("-"* BAR_WIDTH)
+    # Return to the start of the line and clear it, rather than clearing the whole screen
+    sys.stdout.write("\r\x1b[2K" + _BAR_LOOKUP[bar_length])
+    sys.stdout.flush()
     
 if __name__ == "__main__":
     asyncio.run(process_audio())
\ No newline at end of file
@@ -1,5 +1,6 @@
 #include <stdio.h>
 #include <stdlib.h>
+#include <stdint.h>
 #include <string.h>
 #include <math.h>
 
@@ -23,6 +24,11 @@
 // Ensure your terminal is configured for UTF-8.
 #define BAR_CHAR '.' 
 #define PORT 12345 // Example port, ensure it matches the Python client
+// Each message is a little-endian float32 RMS followed by a uint32 pitch in Hz, matching
+// VISUALISER_MESSAGE in Agent/config.py.
+// The fields are copied directly, so this assumes a little-endian host (x86, ARM).
+// A datagram may carry several consecutive messages; only the newest (last) is rendered.
+#define MESSAGE_SIZE 8
 
 void clear_terminal() {
 #ifdef _WIN32
@@ -116,20 +122,13 @@ int main() {
         ssize_t n = recvfrom(sockfd, (char *)buffer, sizeof(buffer) -1,
                          0, (struct sockaddr *) &cliaddr, // MSG_WAITALL might not be ideal for UDP, using 0
                          &len);
-        if (n > 0) {
-            buffer[n] = '\0';
-            float rms_value = 0.0f;
-            int pitch_value = 0;
-            // Expecting data in format "rms,pitch"
-            char* token = strtok(buffer, ",");
-            if (token != NULL) {
-                rms_value = atof(token);
-                token = strtok(NULL, ",");
-                if (token != NULL) {
-                    pitch_value = atoi(token);
-                }
-            }
-            render_audio(rms_value, pitch_value); // Modified
+        if (n >= MESSAGE_SIZE) {
+            float rms_value;
+            uint32_t pitch_value;
+            const char *message = buffer + ((size_t)n / MESSAGE_SIZE - 1) * MESSAGE_SIZE;
+            memcpy(&rms_value, message, sizeof(rms_value));
+            memcpy(&pitch_value, message + sizeof(rms_value), sizeof(pitch_value));
+            render_audio(rms_value, (int)pitch_value);
         } else if (n < 0) {
             perror("recvfrom error");
             // Potentially break or handle error
@@ -1,9 +1,10 @@
 import os
 import sys
-import subprocess
-import time
 import socket
 import asyncio
+from typing import Optional
+
+import numpy as np
 
 # --- Configuration ---
 # Set to "LIVE" to run Gemini Client, "FILE" to run with a sample audio file.
@@ -19,120 +20,281 @@ sys.path.insert(0, _PROJECT_ROOT_FOR_SYS_PATH)
 
 from Agent.config import (
     RMS_SAMPLING_INTERVAL_MS,
+    VISUALISER_DIR,
     VISUALISER_EXE_PATH,
-    GEMINI_CLIENT_SCRIPT_PATH,
+    VISUALISER_LAUNCH_SCRIPT_PATH,
+    VISUALISER_LAUNCH_SCRIPT_COMPILED_PATH,
     DEFAULT_SAMPLE_AUDIO_FILE,
+    VISUALISER_BATCH_RECORDS,
+    VISUALISER_UDP_HOST,
+    VISUALISER_UDP_PORT,
+    VISUALISER_UDP_SNDBUF_BYTES,
+    VISUALISER_MESSAGE,
+    VISUALISER_RECORD_DTYPE,
     # PROJECT_ROOT is also available from config but not directly used here after imports
 )
 from Agent.RMS_Sampler import stream_audio_and_calculate_rms # For FILE mode
 
-VISUALISER_UDP_HOST = "localhost"
-VISUALISER_UDP_PORT = 12345  # Must match the port in visualiser.c
+# How long to wait for the visualiser to bind its port (a new Terminal window can be slow to open)
+VISUALISER_READY_TIMEOUT_S = 5.0
+VISUALISER_READY_FIRST_PROBE_S = 0.02
+# Shared limit for the visualiser and Gemini Client to stop before the visualiser is killed
+SHUTDOWN_TIMEOUT_S = 5.0
+# Linux socket options not exported by Python's socket module (from <linux/in.h>)
+_IP_MTU_DISCOVER = getattr(socket, "IP_MTU_DISCOVER", 10)
+_IP_PMTUDISC_DO = getattr(socket, "IP_PMTUDISC_DO", 2)
+
+# The visualiser paths come from config and never change, so the existence check and the choice
+# of macOS launch script are made once at import rather than on every launch. A compiled .scpt
+# skips osascript's compile step; the plain-text script works without one.
+_VIS_EXISTS = os.path.exists(VISUALISER_EXE_PATH)
+_VIS_LAUNCH_SCRIPT = (
+    VISUALISER_LAUNCH_SCRIPT_COMPILED_PATH
+    if os.path.exists(VISUALISER_LAUNCH_SCRIPT_COMPILED_PATH)
+    else VISUALISER_LAUNCH_SCRIPT_PATH
+)
+
+def tune_visualiser_socket(sock: socket.socket) -> None:
+    """
+    Enlarges the UDP send buffer and, on Linux, forbids fragmenting visualiser datagrams.
+
+    Args:
+        sock: The UDP socket sending to the visualiser.
+    """
+    # A larger kernel send buffer absorbs bursts rather than dropping or stalling sends
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, VISUALISER_UDP_SNDBUF_BYTES)
+    except OSError as e:
+        print(f"Could not enlarge visualiser send buffer: {e}")
+    # Set the Don't Fragment bit so an oversized batch fails loudly instead of being fragmented
+    if sys.platform.startswith("linux"):
+        try:
+            sock.setsockopt(socket.IPPROTO_IP, _IP_MTU_DISCOVER, _IP_PMTUDISC_DO)
+        except OSError as e:
+            print(f"Could not enable path MTU discovery on visualiser socket: {e}")
+
+class VisualiserProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol for the visualiser link that records ICMP port-unreachable errors."""
+
+    def __init__(self) -> None:
+        """Initialises the protocol with no refusal seen."""
+        self.refused = False
+
+    def error_received(self, exc: Exception) -> None:
+        """
+        Records whether a datagram was refused because nothing is listening on the port.
 
-def start_c_visualiser():
-    """Starts the C visualiser application."""
-    if not os.path.exists(VISUALISER_EXE_PATH):
+        Args:
+            exc: The error reported for an earlier datagram.
+        """
+        if isinstance(exc, ConnectionRefusedError):
+            self.refused = True
+
+async def wait_for_visualiser(transport: asyncio.DatagramTransport, protocol: VisualiserProtocol) -> bool:
+    """
+    Probes the visualiser's UDP port with zero records until it is listening.
+
+    A zero record just draws empty bars, but sent to a closed port it is answered with ICMP
+    port-unreachable, which the connected transport reports as a refusal. (Empty datagrams
+    would be neater, but asyncio drops them before sending on Python < 3.12.) The wait
+    between probes doubles each time, up to VISUALISER_READY_TIMEOUT_S in total.
+
+    Args:
+        transport: A datagram transport connected to the visualiser.
+        protocol: The transport's protocol.
+
+    Returns:
+        bool: True once a probe is not refused, False if the timeout expires first.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + VISUALISER_READY_TIMEOUT_S
+    delay = VISUALISER_READY_FIRST_PROBE_S
+    probe = VISUALISER_MESSAGE.pack(0.0, 0)
+    while True:
+        protocol.refused = False
+        transport.sendto(probe)
+        remaining = deadline - loop.time()
+        await asyncio.sleep(min(delay, max(remaining, 0.0)))
+        if not protocol.refused:
+            return True
+        if loop.time() >= deadline:
+            return False
+        delay *= 2
+
+async def start_c_visualiser() -> Optional[asyncio.subprocess.Process]:
+    """
+    Starts the C visualiser application without blocking the event loop.
+
+    Returns:
+        Optional[asyncio.subprocess.Process]: The launched process (osascript on macOS), or None on failure.
+    """
+    if not _VIS_EXISTS:
         print(f"Error: C Visualiser executable not found at {VISUALISER_EXE_PATH}")
-        print("Please compile visualiser.c first (e.g., gcc Visualisation/visualiser.c -o Visualisation/Visualiser.out -lm)") # Corrected output name
+        print("Please compile visualiser.c first, and again after it changes:")
+        print("    gcc Visualisation/visualiser.c -o Visualisation/Visualiser.out -lm")
         return None
     
     print(f"Starting C Visualiser: {VISUALISER_EXE_PATH}")
     try:
         visualiser_process = None
         if sys.platform == "darwin": # macOS
-            visualiser_dir = os.path.dirname(VISUALISER_EXE_PATH)
-            
-            # Escape backslashes and double quotes in paths for AppleScript string literals
-            # This makes them safe to be embedded in the f-string constructing the AppleScript command.
-            as_literal_visualiser_dir = visualiser_dir.replace('\\\\', '\\\\\\\\').replace('"', '\\\\"')
-            as_literal_visualiser_exe_path = VISUALISER_EXE_PATH.replace('\\\\', '\\\\\\\\').replace('"', '\\\\"')
-
-            apple_script_command = (
-                f'tell application "Terminal"\n'
-                f'    activate\n'
-                f'    set dir_path to "{as_literal_visualiser_dir}"\n'
-                f'    set exe_path to "{as_literal_visualiser_exe_path}"\n'
-                f'    set shell_command to "cd " & quoted form of dir_path & " && " & quoted form of exe_path\n'
-                f'    do script shell_command\n'
-                f'end tell'
+            # The paths are passed as arguments to the script's run handler, so they need no escaping
+            visualiser_process = await asyncio.create_subprocess_exec(
+                'osascript', _VIS_LAUNCH_SCRIPT, VISUALISER_DIR, VISUALISER_EXE_PATH
             )
-            
-            visualiser_process = subprocess.Popen(['osascript', '-e', apple_script_command])
             print(f"C Visualiser launched in a new Terminal window via AppleScript (osascript PID: {visualiser_process.pid if visualiser_process else 'N/A'}).")
             # The PID here is for osascript, not the C visualiser directly.
         else:
             # Fallback for other OSes
             print("Attempting to start C Visualiser in the current environment (not a new window for non-macOS).")
-            visualiser_process = subprocess.Popen([VISUALISER_EXE_PATH])
+            visualiser_process = await asyncio.create_subprocess_exec(VISUALISER_EXE_PATH)
             print(f"C Visualiser started with PID: {visualiser_process.pid if visualiser_process else 'N/A'}")
 
-        time.sleep(2)  # Give it a moment to start up (increased for new window)
+        # Readiness is probed by main_async_runner instead of sleeping for a fixed time
         return visualiser_process
     except Exception as e:
         print(f"Failed to start C visualiser: {e}")
         return None
 
-async def run_file_mode(visualiser_socket_sender):
-    """Runs the visualiser with a sample audio file."""
+async def run_file_mode(visualiser_transport: asyncio.DatagramTransport) -> None:
+    """
+    Runs the visualiser with a sample audio file.
+
+    Args:
+        visualiser_transport: A datagram transport connected to the visualiser.
+    """
     print(f"Running in FILE mode with: {DEFAULT_SAMPLE_AUDIO_FILE}")
     if not os.path.exists(DEFAULT_SAMPLE_AUDIO_FILE):
         print(f"Error: Sample audio file not found: {DEFAULT_SAMPLE_AUDIO_FILE}")
         return
 
     print(f"Streaming RMS from {DEFAULT_SAMPLE_AUDIO_FILE} to C visualiser at {VISUALISER_UDP_HOST}:{VISUALISER_UDP_PORT} and playing audio.")
+    # One datagram buffer holding VISUALISER_BATCH_RECORDS messages, viewed as a record array so a
+    # whole batch of RMS values is written in one assignment. Pitch stays 0 in FILE mode. The
+    # transport is already connected to the visualiser, so no address is passed per send.
+    record_size = VISUALISER_RECORD_DTYPE.itemsize
+    datagram = bytearray(record_size * VISUALISER_BATCH_RECORDS)
+    datagram_view = memoryview(datagram)
+    records_rms = np.frombuffer(datagram, dtype=VISUALISER_RECORD_DTYPE)['rms']
+    send = visualiser_transport.sendto
     try:
         # stream_audio_and_calculate_rms already incorporates a delay based on RMS_SAMPLING_INTERVAL_MS
-        async for rms_value in stream_audio_and_calculate_rms(DEFAULT_SAMPLE_AUDIO_FILE, play_audio=True):
-            message = str(rms_value).encode('utf-8')
-            visualiser_socket_sender.sendto(message, (VISUALISER_UDP_HOST, VISUALISER_UDP_PORT))
-            
+        async for rms_batch in stream_audio_and_calculate_rms(
+            DEFAULT_SAMPLE_AUDIO_FILE, play_audio=True, batch=VISUALISER_BATCH_RECORDS
+        ):
+            count = 1 if VISUALISER_BATCH_RECORDS == 1 else rms_batch.size
+            records_rms[:count] = rms_batch
+            # Never blocks: the transport copies the datagram if the socket is busy. A visualiser
+            # that isn't listening yet only reaches the protocol's (ignored) error_received.
+            send(datagram_view[:count * record_size])
+
     except Exception as e:
         print(f"Error during file mode: {e}")
     finally:
         print("File mode finished.")
-        # Send a zero RMS to clear the bar
+        # Send a zero RMS so the bar is cleared
         try:
-            message = "0.0".encode('utf-8')
-            visualiser_socket_sender.sendto(message, (VISUALISER_UDP_HOST, VISUALISER_UDP_PORT))
+            send(VISUALISER_MESSAGE.pack(0.0, 0))
         except Exception as e:
             print(f"Error sending zero RMS: {e}")
 
-def run_live_mode():
-    """Runs the live conversation with Gemini Client."""
+async def run_live_mode(visualiser_transport: asyncio.DatagramTransport) -> Optional["asyncio.Task[None]"]:
+    """
+    Runs the live conversation with Gemini Client as a task in this event loop.
+
+    Args:
+        visualiser_transport: A datagram transport connected to the visualiser, shared with the client.
+
+    Returns:
+        Optional[asyncio.Task[None]]: The Gemini Client task, or None if it could not be started.
+    """
     print("Running in LIVE mode. Starting Gemini Client...")
-    if not os.path.exists(GEMINI_CLIENT_SCRIPT_PATH):
-        print(f"Error: Gemini Client script not found: {GEMINI_CLIENT_SCRIPT_PATH}")
-        return None
-    
     try:
-        # Run Gemini Client. It should now be modified to send UDP packets.
-        # Ensure the Python interpreter used here is the correct one for your environment.
-        gemini_process = subprocess.Popen([sys.executable, GEMINI_CLIENT_SCRIPT_PATH])
-        print(f"Gemini Client started with PID: {gemini_process.pid}")
-        return gemini_process
-    except Exception as e:
-        print(f"Failed to start Gemini Client: {e}")
+        # Imported here so FILE mode doesn't need the Gemini and PyAudio dependencies
+        from Agent.gemini_client import run as gemini_run
+    except ImportError as e:
+        print(f"Failed to import Gemini Client: {e}")
         return None
 
+    return asyncio.create_task(gemini_run(visualiser_transport))
+
+async def stop_children(
+    visualiser_process: Optional[asyncio.subprocess.Process],
+    gemini_task: Optional["asyncio.Task[None]"],
+) -> None:
+    """
+    Stops the C visualiser and the Gemini Client together, killing the visualiser if it outlives the timeout.
+
+    Both are signalled first and then awaited concurrently, so shutdown takes at most
+    SHUTDOWN_TIMEOUT_S in total rather than that long for each in turn.
+
+    Args:
+        visualiser_process: The visualiser (or osascript) process, if one was started.
+        gemini_task: The Gemini Client task, if LIVE mode started one.
+    """
+    stopping = []
+    if visualiser_process:
+        if visualiser_process.returncode is None: # Check if process is still running
+            print("Terminating C Visualiser...")
+            visualiser_process.terminate()
+            stopping.append(asyncio.ensure_future(visualiser_process.wait()))
+        else:
+            print("C Visualiser already terminated.")
+
+    if gemini_task:
+        if not gemini_task.done():
+            print("Stopping Gemini Client...")
+            # The client handles cancellation itself, closing its audio streams before returning
+            gemini_task.cancel()
+            stopping.append(gemini_task)
+        else:
+            print("Gemini Client already finished.")
+
+    if not stopping:
+        return
+    await asyncio.wait(stopping, timeout=SHUTDOWN_TIMEOUT_S)
+
+    if visualiser_process and visualiser_process.returncode is None:
+        print("C Visualiser did not terminate gracefully, killing.")
+        visualiser_process.kill()
+        await visualiser_process.wait()
+    if gemini_task and not gemini_task.done():
+        print(f"Gemini Client did not stop within {SHUTDOWN_TIMEOUT_S:.0f} s.")
+
 async def main_async_runner():
-    visualiser_process = start_c_visualiser()
+    visualiser_process = await start_c_visualiser()
     if not visualiser_process:
         return
 
-    # UDP Socket for sending RMS data (used by FILE mode directly, LIVE mode uses its own)
-    udp_sender_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    gemini_process_live = None
+    # Non-blocking UDP transport for sending RMS data, shared by FILE mode and the LIVE-mode client
+    visualiser_transport = None
+    gemini_task_live = None
 
     try:
+        # Resolved and connected once, so sends don't rebuild (or re-resolve) the destination address
+        loop = asyncio.get_running_loop()
+        visualiser_address = (await loop.getaddrinfo(
+            VISUALISER_UDP_HOST, VISUALISER_UDP_PORT, family=socket.AF_INET, type=socket.SOCK_DGRAM
+        ))[0][4]
+        # asyncio creates the socket non-blocking, and Python sockets are non-inheritable, so the
+        # visualiser subprocess never receives this descriptor
+        visualiser_transport, visualiser_protocol = await loop.create_datagram_endpoint(
+            VisualiserProtocol, local_addr=(visualiser_address[0], 0), remote_addr=visualiser_address
+        )
+        tune_visualiser_socket(visualiser_transport.get_extra_info("socket"))
+
+        if await wait_for_visualiser(visualiser_transport, visualiser_protocol):
+            print("C Visualiser is listening.")
+        else:
+            print(f"Warning: C Visualiser not listening after {VISUALISER_READY_TIMEOUT_S:.0f} s; continuing anyway.")
+
         if OPERATION_MODE == "FILE":
-            await run_file_mode(udp_sender_socket)
+            await run_file_mode(visualiser_transport)
         elif OPERATION_MODE == "LIVE":
-            gemini_process_live = run_live_mode()
-            if gemini_process_live:
+            gemini_task_live = await run_live_mode(visualiser_transport)
+            if gemini_task_live:
                 print("Live mode started. Waiting for Gemini Client to complete...")
-                # Asynchronously wait for the Gemini client process to complete
-                # This keeps the main script running and allows for graceful shutdown
-                await asyncio.to_thread(gemini_process_live.wait)
+                await gemini_task_live
         else:
             print(f"Error: Unknown OPERATION_MODE: {OPERATION_MODE}")
 
@@ -142,32 +304,10 @@ async def main_async_runner():
         print(f"An error occurred in main_async_runner: {e}")
     finally:
         print("Cleaning up resources...")
-        if visualiser_process:
-            if visualiser_process.poll() is None: # Check if process is still running
-                print("Terminating C Visualiser...")
-                visualiser_process.terminate()
-                try:
-                    visualiser_process.wait(timeout=5) # Wait for a few seconds
-                except subprocess.TimeoutExpired:
-                    print("C Visualiser did not terminate gracefully, killing.")
-                    visualiser_process.kill()
-            else:
-                print("C Visualiser already terminated.")
-
-        if gemini_process_live:
-            if gemini_process_live.poll() is None: # Check if process is still running
-                print("Terminating Gemini Client...")
-                gemini_process_live.terminate()
-                try:
-                    gemini_process_live.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    print("Gemini Client did not terminate gracefully, killing.")
-                    gemini_process_live.kill()
-            else:
-                print("Gemini Client already terminated.")
-        
-        if udp_sender_socket:
-            udp_sender_socket.close()
+        await stop_children(visualiser_process, gemini_task_live)
+
+        if visualiser_transport:
+            visualiser_transport.close()
         print("Cleanup complete.")
 
 if __name__ == "__main__":